@@ -3,14 +3,95 @@ AirSight ML Prediction System - FIXED AQI Calculations
 Proper AQI ranges: 0-150, not 500!
 """
 
+import sys
+from math import pi
 import numpy as np
-import pandas as pd
-import pickle
+from bisect import bisect_left
 from datetime import datetime, timedelta
-import hashlib
 import warnings
 warnings.filterwarnings('ignore')
 
+from numba_compat import HAS_NUMBA, njit
+
+# Pollutant names shared by every prediction dict
+_PM25 = sys.intern('PM2.5 - Local Conditions')
+_PM10 = sys.intern('PM10 Total 0-10um STP')
+_CO = sys.intern('Carbon monoxide')
+_NO2 = sys.intern('Nitrogen dioxide (NO2)')
+_SO2 = sys.intern('Sulfur dioxide')
+_O3 = sys.intern('Ozone')
+
+# (pollutant, unit, base, std) for get_highest_concentration_days
+_PEAK_POLLUTANTS = (
+    (_PM25, 'µg/m³', 35, 12),
+    (_O3, 'ppb', 65, 15),
+    (_NO2, 'ppb', 28, 10),
+    (_SO2, 'ppb', 18, 6),
+    (_CO, 'ppm', 1.2, 0.4)
+)
+_PEAK_NAMES, _PEAK_UNITS, _PEAK_BASES, _PEAK_STDS = zip(*_PEAK_POLLUTANTS)
+_PEAK_BASES = np.array(_PEAK_BASES, dtype=np.float64)
+_PEAK_STDS = np.array(_PEAK_STDS, dtype=np.float64)
+# FIXED: Realistic concentration ranges
+_PEAK_MINS = np.array([0.2 if unit == 'ppm' else 5 for unit in _PEAK_UNITS], dtype=np.float64)
+_PEAK_MAXS = np.array([3.0 if unit == 'ppm' else 80 for unit in _PEAK_UNITS], dtype=np.float64)
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+def _mix_seed(x):
+    """SplitMix64-style integer hash, folded to a 32-bit seed"""
+    x = (x * 0x9E3779B97F4A7C15) & _MASK64
+    x ^= x >> 30
+    x = (x * 0xBF58476D1CE4E5B9) & _MASK64
+    x ^= x >> 27
+    return x & 0xFFFFFFFF
+
+def _day_of_year(ordinal, year):
+    """1-based day of year, without building a struct_time via timetuple()"""
+    return ordinal - datetime(year, 1, 1).toordinal() + 1
+
+# Direct-mapped prediction cache: slot = ordinal & (size - 1), entry = ordinal << 8 | aqi
+_AQI_CACHE_SIZE = 8192
+
+# Seasonal angular frequency (radians per day) and sin term for every day_of_year (index 1-366)
+_OMEGA = 2 * pi / 365
+_SEASONAL = np.sin(np.arange(367) * _OMEGA)
+_SEASONAL_ABS = np.abs(_SEASONAL)
+
+@njit(cache=True, fastmath=True)
+def _aqi_kernel(day_of_year, daily_variation, seasonal):
+    """Seasonal base + daily variation, clamped to 15-150"""
+    aqi = 45.0 + 25.0 * seasonal[day_of_year] + daily_variation
+    return round(max(15.0, min(150.0, aqi)))
+
+# datetime ordinal of 1970-01-01, the datetime64 epoch
+_EPOCH_ORDINAL = 719163
+
+def _predict_aqi_many(ordinals):
+    """Vectorized _aqi_kernel over date ordinals; each date still draws from its own seeded stream"""
+    days = (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+    day_of_year = (days - days.astype('datetime64[Y]')).astype(np.int64) + 1
+    default_rng = np.random.default_rng
+    daily_variation = np.array([default_rng(_mix_seed(ordinal)).normal(0, 15) for ordinal in ordinals.tolist()])
+    aqi = 45.0 + 25.0 * _SEASONAL[day_of_year] + daily_variation
+    np.clip(aqi, 15.0, 150.0, out=aqi)
+    return np.round(aqi).astype(np.int64)
+
+def _predict_aqi(ordinal):
+    """FIXED AQI prediction for a date ordinal - proper ranges 15-150"""
+    date = datetime.fromordinal(ordinal)
+    rng = np.random.default_rng(_mix_seed(ordinal))
+    
+    # FIXED: Proper AQI calculation with realistic ranges (15-150, not 500!)
+    day_of_year = _day_of_year(ordinal, date.year)
+    daily_variation = rng.normal(0, 15)
+    
+    return _aqi_kernel(day_of_year, daily_variation, _SEASONAL)
+
+if HAS_NUMBA:
+    # Warm up the JIT so the first request doesn't pay the compile cost
+    _aqi_kernel(1, 0.0, _SEASONAL)
+
 class AQIPredictionSystem:
     def __init__(self):
         self.models = {}
@@ -21,7 +102,22 @@ class AQIPredictionSystem:
         self.use_pycaret = False
         self.predictors = ["year", "month", "day", "weekday", "daily_avg_temp"]
         self.pollutants = ["PM2.5", "PM10", "CO", "NO2", "SO2", "O3"]
-        self._prediction_cache = {}
+        self._seasonal = _SEASONAL
+        self._seasonal_abs = _SEASONAL_ABS
+        self._aqi_cache = np.full(_AQI_CACHE_SIZE, -1, dtype=np.int64)
+
+        # Concentration model per pollutant: max(floor, base + slope*season + abs_slope*|season| + std*N(0,1))
+        self._conc_names = (_PM25, _PM10, _CO, _NO2, _SO2, _O3)
+        self._conc_base = np.array([20, 35, 1.2, 0.025, 0.012, 0.050])
+        self._conc_slope = np.array([10, 15, 0.5, 0.010, 0.005, 0.0])
+        self._conc_abs_slope = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.015])
+        self._conc_std = np.array([8, 12, 0.4, 0.008, 0.004, 0.012])
+        self._conc_floor = np.array([5, 10, 0.1, 0.005, 0.002, 0.020])
+
+        # Realistic main pollutant distribution (PM2.5 most common), as a cumulative table
+        self._main_pollutants = (_PM25, _O3, _NO2, _PM10)
+        self._main_cum = np.cumsum([0.45, 0.25, 0.20, 0.10])
+        self._main_cum /= self._main_cum[-1]
         
         # AQI Breakpoints (FIXED - for proper calculations)
         self.breakpoints = {
@@ -44,11 +140,26 @@ class AQIPredictionSystem:
                   (0.086, 0.105, 151, 200), (0.106, 0.200, 201, 300)]
         }
 
+        # Per pollutant: sorted segment upper bounds for bisection, and (Clow, slope, Ilow) per segment.
+        # Values between segments, below zero or NaN match no segment and fall through to 180; the
+        # trailing NaN-Clow sentinel catches everything above the last bound the same way.
+        self._segments = {}
+        self._segment_arrays = {}
+        for pollutant, rows in self.breakpoints.items():
+            highs = [Chigh for _, Chigh, _, _ in rows]
+            segs = [(Clow, (Ihigh - Ilow) / (Chigh - Clow), Ilow) for Clow, Chigh, Ilow, Ihigh in rows]
+            self._segments[pollutant] = (highs, segs + [(float('nan'), 0.0, 180)])
+            lows, slopes, ilows = (np.array(col, dtype=np.float64) for col in zip(*segs))
+            self._segment_arrays[pollutant] = (np.array(highs, dtype=np.float64), lows, slopes, ilows)
+
     def load_models(self, filename):
         """Load models with GOOD performance metrics"""
+        import mmap
+        import pickle
         try:
-            with open(filename, 'rb') as f:
-                save_data = pickle.load(f)
+            # Unpickle straight from a read-only mapping of the file (no extra read buffer copy)
+            with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                save_data = pickle.loads(mm)
             
             # Check if this is PyCaret models
             if 'final_models' in save_data and save_data['final_models']:
@@ -126,106 +237,107 @@ class AQIPredictionSystem:
 
     def predict_aqi_for_date(self, date, model_name=None):
         """FIXED AQI prediction - proper ranges 15-150"""
-        date_str = date.strftime('%Y-%m-%d')
-        cache_key = f"{date_str}_{model_name or 'default'}"
-        
-        # Check cache first
-        if cache_key in self._prediction_cache:
-            return self._prediction_cache[cache_key]
-        
-        # Generate consistent seed
-        date_seed = self._get_date_seed(date)
-        np.random.seed(date_seed)
+        ordinal = date.toordinal()
+        slot = ordinal & (_AQI_CACHE_SIZE - 1)
         
-        # FIXED: Proper AQI calculation with realistic ranges
-        day_of_year = date.timetuple().tm_yday
+        # Check cache first (key and value packed in one word, so one read/write)
+        entry = self._aqi_cache.item(slot)
+        if entry >> 8 == ordinal:
+            return entry & 0xFF
         
-        # Base AQI with seasonal pattern (15-120 range)
-        base_aqi = 45 + 25 * np.sin(day_of_year * 2 * np.pi / 365)
-        
-        # Add daily variation
-        daily_variation = np.random.normal(0, 15)
-        
-        # Calculate final AQI
-        aqi = base_aqi + daily_variation
-        
-        # FIXED: Proper bounds (15-150, not 500!)
-        aqi = max(15, min(150, aqi))
+        aqi = _predict_aqi(ordinal)
+        self._aqi_cache[slot] = (ordinal << 8) | aqi
+        return aqi
+
+    def predict_aqi_batch(self, dates, model_name=None):
+        """Vectorized predict_aqi_for_date over a sequence of dates"""
+        ordinals = np.fromiter((date.toordinal() for date in dates), dtype=np.int64, count=len(dates))
         
-        np.random.seed(None)
+        # Probe the prediction cache for the whole batch at once
+        entries = self._aqi_cache[ordinals & (_AQI_CACHE_SIZE - 1)]
+        aqis = entries & 0xFF
         
-        # Cache result
-        final_aqi = round(aqi)
-        self._prediction_cache[cache_key] = final_aqi
+        # Compute all misses in one pass and fill their cache slots
+        misses = np.flatnonzero((entries >> 8) != ordinals)
+        if misses.size:
+            miss_ordinals = ordinals[misses]
+            aqis[misses] = miss_aqis = _predict_aqi_many(miss_ordinals)
+            self._aqi_cache[miss_ordinals & (_AQI_CACHE_SIZE - 1)] = (miss_ordinals << 8) | miss_aqis
         
-        return final_aqi
+        return aqis
 
     def calculate_individual_aqi(self, concentration, pollutant):
         """FIXED AQI calculation"""
         try:
-            if pollutant not in self.breakpoints:
+            segments = self._segments.get(pollutant)
+            if segments is None:
                 return 50
-                
-            for bp in self.breakpoints[pollutant]:
-                Clow, Chigh, Ilow, Ihigh = bp
-                if Clow <= concentration <= Chigh:
-                    aqi = ((Ihigh - Ilow) / (Chigh - Clow)) * (concentration - Clow) + Ilow
-                    return round(max(0, min(200, aqi)))  # Cap at 200, not 500
-            
+
+            highs, segs = segments
+            Clow, slope, Ilow = segs[bisect_left(highs, concentration)]
+            if concentration >= Clow:
+                aqi = slope * (concentration - Clow) + Ilow
+                return round(aqi if aqi <= 200 else 200)  # Cap at 200, not 500
+
             # If above all breakpoints, return high but not extreme
             return 180
         except:
             return 50
 
+    def calculate_individual_aqi_batch(self, concentrations, pollutant):
+        """Vectorized calculate_individual_aqi for an array of concentrations"""
+        concs = np.asarray(concentrations, dtype=np.float64)
+        if pollutant not in self._segment_arrays:
+            return np.full(concs.shape, 50)
+
+        highs, lows, slopes, ilows = self._segment_arrays[pollutant]
+        # NaN sorts past the last bound, so it lands with the above-range values
+        idx = np.searchsorted(highs, concs, side='left')
+        in_range = idx < len(highs)
+        idx[~in_range] = 0
+        in_segment = in_range & (concs >= lows[idx])
+
+        aqi = slopes[idx] * (np.where(in_segment, concs, lows[idx]) - lows[idx]) + ilows[idx]
+        np.clip(aqi, 0, 200, out=aqi)
+        aqi = np.where(in_segment, aqi, 180)
+        return np.round(aqi).astype(int)
+
     def predict_pollutant_concentrations(self, date, model_name=None):
         """FIXED pollutant concentration prediction"""
-        date_seed = self._get_date_seed(date)
-        np.random.seed(date_seed)
+        rng = np.random.default_rng(self._get_date_seed(date))
         
-        # FIXED: Realistic concentration ranges
-        day_of_year = date.timetuple().tm_yday
-        seasonal_factor = np.sin(day_of_year * 2 * np.pi / 365)
+        # FIXED: Realistic concentration ranges, all six pollutants in one pass
+        day_of_year = _day_of_year(date.toordinal(), date.year)
+        values = self._conc_std * rng.standard_normal(len(self._conc_names))
+        values += self._conc_base
+        values += self._conc_slope * self._seasonal[day_of_year]
+        values += self._conc_abs_slope * self._seasonal_abs[day_of_year]
+        np.maximum(values, self._conc_floor, out=values)
         
-        concentrations = {
-            'PM2.5 - Local Conditions': max(5, 20 + 10 * seasonal_factor + np.random.normal(0, 8)),
-            'PM10 Total 0-10um STP': max(10, 35 + 15 * seasonal_factor + np.random.normal(0, 12)),
-            'Carbon monoxide': max(0.1, 1.2 + 0.5 * seasonal_factor + np.random.normal(0, 0.4)),
-            'Nitrogen dioxide (NO2)': max(0.005, 0.025 + 0.010 * seasonal_factor + np.random.normal(0, 0.008)),
-            'Sulfur dioxide': max(0.002, 0.012 + 0.005 * seasonal_factor + np.random.normal(0, 0.004)),
-            'Ozone': max(0.020, 0.050 + 0.015 * abs(seasonal_factor) + np.random.normal(0, 0.012))
-        }
+        concentrations = dict(zip(self._conc_names, values.tolist()))
         
-        np.random.seed(None)
         return concentrations
 
     def get_main_pollutant_for_date(self, date):
         """FIXED main pollutant selection"""
-        date_seed = self._get_date_seed(date)
-        np.random.seed(date_seed)
-        
-        # Realistic pollutant distribution
-        pollutants = ['PM2.5 - Local Conditions', 'Ozone', 'Nitrogen dioxide (NO2)', 'PM10 Total 0-10um STP']
-        weights = [0.45, 0.25, 0.20, 0.10]  # PM2.5 most common
+        rng = np.random.default_rng(self._get_date_seed(date))
         
-        main_pollutant = np.random.choice(pollutants, p=weights)
-        
-        np.random.seed(None)
-        return main_pollutant
+        idx = np.searchsorted(self._main_cum, rng.random(), side='right')
+        return self._main_pollutants[idx]
 
     def _get_date_seed(self, date):
         """Generate consistent seed based on date"""
-        date_str = date.strftime('%Y-%m-%d')
-        return int(hashlib.md5(date_str.encode()).hexdigest()[:8], 16) % (2**32)
+        return _mix_seed(date.toordinal())
 
     def predict_7_day_trend(self, start_date, model_name=None):
         """FIXED 7-day trend prediction"""
+        dates = [start_date + timedelta(days=i) for i in range(7)]
+        aqis = self.predict_aqi_batch(dates, model_name)
         trend_data = []
-        for i in range(7):
-            date = start_date + timedelta(days=i)
-            aqi = self.predict_aqi_for_date(date, model_name)
+        for date, aqi in zip(dates, aqis.tolist()):
             trend_data.append({
-                'date': date.strftime('%m-%d'),
-                'aqi': round(aqi)
+                'date': f"{date.month:02d}-{date.day:02d}",
+                'aqi': aqi
             })
         return trend_data
 
@@ -235,37 +347,21 @@ class AQIPredictionSystem:
         _, num_days = monthrange(year, month)
         
         pollutant_peaks = {}
-        month_str = f"{year}-{month:02d}"
-        month_seed = int(hashlib.md5(month_str.encode()).hexdigest()[:8], 16) % (2**32)
-
-        pollutants_info = [
-            ('PM2.5 - Local Conditions', 'µg/m³', 35, 12),
-            ('Ozone', 'ppb', 65, 15), 
-            ('Nitrogen dioxide (NO2)', 'ppb', 28, 10),
-            ('Sulfur dioxide', 'ppb', 18, 6),
-            ('Carbon monoxide', 'ppm', 1.2, 0.4)
-        ]
-
-        for i, (pollutant, unit, base, std) in enumerate(pollutants_info):
-            pollutant_seed = month_seed + i * 1000
-            np.random.seed(pollutant_seed)
-            
-            peak_day = np.random.randint(1, num_days + 1)
-            
-            # FIXED: Realistic concentration ranges
-            concentration = max(base * 0.3, base + np.random.normal(0, std))
-            if unit == 'ppm':
-                concentration = max(0.2, min(3.0, concentration))
-            else:
-                concentration = max(5, min(80, concentration))
-            
+        month_seed = _mix_seed(year * 13 + month)
+
+        # Peak day and peak level for all pollutants in one pass
+        rng = np.random.default_rng(month_seed)
+        peak_days = rng.integers(1, num_days + 1, size=len(_PEAK_NAMES))
+        peak_concs = np.maximum(_PEAK_BASES * 0.3, _PEAK_BASES + _PEAK_STDS * rng.standard_normal(len(_PEAK_NAMES)))
+        np.clip(peak_concs, _PEAK_MINS, _PEAK_MAXS, out=peak_concs)
+
+        for pollutant, unit, day, concentration in zip(_PEAK_NAMES, _PEAK_UNITS, peak_days.tolist(), peak_concs.tolist()):
             pollutant_peaks[pollutant] = {
-                'day': peak_day,
+                'day': day,
                 'concentration': round(concentration, 1),
                 'unit': unit
             }
         
-        np.random.seed(None)
         return pollutant_peaks
 
     def save_models(self, filename):
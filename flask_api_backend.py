@@ -3,15 +3,25 @@ AirSight Backend API Server
 COMPLETELY FIXED: Proper AQI ranges, all endpoints working, no duplicate routes
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from flask_caching import Cache
+from bisect import bisect_left
 from datetime import datetime, timedelta
+from functools import lru_cache
 import json
 import numpy as np
-import random
-import calendar
-import hashlib
+import orjson
+from numpy.random import default_rng
+from calendar import monthrange
+import zlib
+import logging
 import math
+import os
+import threading
+
+from numba_compat import njit
 
 # Import the FIXED AQI prediction system
 try:
@@ -21,101 +31,239 @@ except ImportError:
     print("AQI System not found. Please run aqi_prediction_system.py first.")
     HAS_AQI_SYSTEM = False
 
+# Fallback seasonal base AQI for day_of_year 1-366 (index day_of_year - 1)
+_BASE_AQI = (50.0 + 20.0 * np.sin(np.arange(1, 367) * 2 * np.pi / 365.0)).astype(np.float32)
+
+class ORJSONProvider(JSONProvider):
+    """jsonify() backed by orjson; serializes NumPy scalars and arrays natively"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+log = logging.getLogger(__name__)
+
+# Full EPA pollutant names -> short display names used by the frontend
+_POLLUTANT_DISPLAY = {
+    'PM2.5 - Local Conditions': 'PM2.5',
+    'Ozone': 'O3',
+    'Nitrogen dioxide (NO2)': 'NO2',
+    'Sulfur dioxide': 'SO2',
+    'Carbon monoxide': 'CO',
+    'PM10 Total 0-10um STP': 'PM10'
+}
+
+# FIXED: Realistic hourly variation (±20%) for the 3-hourly chart: night lower,
+# morning rush higher, afternoon peak highest, evening rush
+_HOURLY_LABELS = [f"{hour:02d}:00" for hour in (0, 3, 6, 9, 12, 15, 18, 21)]
+_HOUR_MULT_TABLE = np.array([0.85, 0.85, 1.15, 1.15, 1.25, 1.25, 1.10, 0.85])
+
+_FORECAST_LABELS = ['PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'O3']
+
+# Dashboard readings: (key, pollutant, default, scale, unit); gases are reported in ppb, CO in ppm
+_SENSOR_SPEC = (
+    ('pm25', 'PM2.5 - Local Conditions', 20, 1, 'µg/m³'),
+    ('o3', 'Ozone', 0.05, 1000, 'ppb'),
+    ('no2', 'Nitrogen dioxide (NO2)', 0.03, 1000, 'ppb'),
+    ('co', 'Carbon monoxide', 1.5, 1, 'ppm'),
+)
+_SENSOR_UNITS = {key: unit for key, _, _, _, unit in _SENSOR_SPEC}
+_SENSOR_DATA_KEYS = ('pm25', 'o3', 'no2')
+_CONCENTRATION_KEYS = ('pm25', 'co', 'o3')
+
+# (model key, default R²) in accuracy-chart order
+_ACCURACY_LABELS = ['GB', 'XGB', 'RF', 'LSTM']
+_ACCURACY_MODELS = (('gradient_boosting', 0.849), ('xgboost', 0.830), ('random_forest', 0.801), ('lstm', 0.603))
+
+# FIXED: High performance values used when no model system is available
+_DEFAULT_ACCURACY = {
+    'labels': _ACCURACY_LABELS,
+    'data': [84.9, 83.0, 80.1, 60.3]
+}
+_DEFAULT_PERF = {
+    'gradient_boosting': {'r2_score': 0.849, 'mae': 8.2, 'rmse': 11.3, 'mape': 12.9},
+    'xgboost': {'r2_score': 0.830, 'mae': 9.1, 'rmse': 13.8, 'mape': 14.5},
+    'random_forest': {'r2_score': 0.801, 'mae': 10.8, 'rmse': 15.2, 'mape': 16.2},
+    'lstm': {'r2_score': 0.603, 'mae': 14.5, 'rmse': 18.2, 'mape': 22.8}
+}
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)  # Enable CORS for frontend requests
 
+# Responses depend on the query string and, through the date/year/month defaults and the
+# today-centred charts, on the current date. SimpleCache is per-process;
+# set AIRSIGHT_CACHE_TYPE=RedisCache and AIRSIGHT_CACHE_REDIS_URL to share across Gunicorn workers.
+cache = Cache(app, config={
+    'CACHE_TYPE': os.environ.get('AIRSIGHT_CACHE_TYPE', 'SimpleCache'),
+    'CACHE_REDIS_URL': os.environ.get('AIRSIGHT_CACHE_REDIS_URL'),
+    'CACHE_DEFAULT_TIMEOUT': 3600
+})
+
+def _request_cache_key(*args, **kwargs):
+    """Cache key from the path, the order-independent query args and today's date"""
+    query = sorted(request.args.items(multi=True))
+    return f"{request.path}|{datetime.now().date().isoformat()}|{query!r}"
+
+def _is_cacheable(response):
+    """Only cache successful responses; handlers return (body, 500) tuples on error"""
+    return not isinstance(response, tuple)
+
 # Initialize the prediction system
-if HAS_AQI_SYSTEM:
-    aqi_system = AQIPredictionSystem()
-    
-    try:
-        success = aqi_system.load_models('complete_pycaret_models.pkl')
-        if success:
-            models_trained = True
-            print("✅ FIXED AQI system loaded successfully!")
-            print(f"Best model: {aqi_system.best_model_name}")
-            print(f"Performance: R² = {aqi_system.model_performances['gradient_boosting']['r2_score']:.3f}")
-        else:
-            raise Exception("Models not found")
-            
-    except Exception as e:
-        print(f"Loading PyCaret failed: {e}")
-        print("Using high-performance default system...")
-        aqi_system._set_default_high_performance()
-        models_trained = True
-        print("✅ Default high-performance system ready!")
-else:
-    models_trained = False
-    aqi_system = None
+# The prediction system is created on first use rather than at import, so workers
+# start without deserializing the (potentially large) pickled models
+models_trained = HAS_AQI_SYSTEM
+_aqi_system = None
+_aqi_system_lock = threading.Lock()
+
+def get_aqi_system():
+    """Return the shared AQIPredictionSystem, loading its models on first call"""
+    global _aqi_system
+    if _aqi_system is None and HAS_AQI_SYSTEM:
+        with _aqi_system_lock:
+            if _aqi_system is None:
+                aqi_system = AQIPredictionSystem()
+                try:
+                    success = aqi_system.load_models('complete_pycaret_models.pkl')
+                    if success:
+                        print("✅ FIXED AQI system loaded successfully!")
+                        print(f"Best model: {aqi_system.best_model_name}")
+                        print(f"Performance: R² = {aqi_system.model_performances['gradient_boosting']['r2_score']:.3f}")
+                    else:
+                        raise Exception("Models not found")
+                        
+                except Exception as e:
+                    print(f"Loading PyCaret failed: {e}")
+                    print("Using high-performance default system...")
+                    aqi_system._set_default_high_performance()
+                    print("✅ Default high-performance system ready!")
+                _aqi_system = aqi_system
+    return _aqi_system
+
+@app.after_request
+def add_etag(response):
+    """Tag deterministic GET responses so clients can revalidate with If-None-Match (304)"""
+    if (request.method == 'GET' and response.status_code == 200
+            and request.endpoint != 'health_check' and not response.direct_passthrough):
+        response.add_etag(weak=True)
+        return response.make_conditional(request)
+    return response
+
+_health_static_bytes = None
+
+def _health_static():
+    """Serialized health fields minus the closing brace; fixed once the model system is loaded
+
+    Probes never trigger the lazy load themselves: until the first data request loads
+    the models, the payload reports them as not loaded yet.
+    """
+    global _health_static_bytes
+    if _health_static_bytes is not None:
+        return _health_static_bytes
+
+    aqi_system = _aqi_system
+    loaded = aqi_system is not None
+    body = orjson.dumps({
+        'status': 'healthy',
+        'models_trained': models_trained,
+        'models_loaded': loaded,
+        'available_models': list(aqi_system.models.keys()) if loaded else [],
+        'best_model': aqi_system.best_model_name if loaded else None,
+        'system_type': 'FIXED_HIGH_PERFORMANCE'
+    })[:-1]
+    if loaded or not models_trained:
+        _health_static_bytes = body
+    return body
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """API health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'models_trained': models_trained,
-        'available_models': list(aqi_system.models.keys()) if models_trained else [],
-        'best_model': aqi_system.best_model_name if models_trained else None,
-        'system_type': 'FIXED_HIGH_PERFORMANCE',
-        'timestamp': datetime.now().isoformat()
-    })
+    timestamp = orjson.dumps({'timestamp': datetime.now().isoformat()})[1:]
+    return Response(_health_static() + b',' + timestamp, mimetype='application/json')
 
+def _fast_parse_date(date_str):
+    """Parse strictly 'YYYY-MM-DD' without strptime (which takes a module-level lock)"""
+    if len(date_str) != 10 or date_str[4] != '-' or date_str[7] != '-':
+        raise ValueError(f"time data {date_str!r} does not match format '%Y-%m-%d'")
+    return datetime.fromisoformat(date_str)
+
+def _seed_for(key):
+    """Deterministic 32-bit RNG seed for a short string key (no crypto hash needed)"""
+    return zlib.crc32(key.encode())
+
+_GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_GOLDEN_GAMMA2 = np.uint64((2 * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF)
+_MIX_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_MUL2 = np.uint64(0x94D049BB133111EB)
+
+@njit(cache=True)
+def _splitmix64(x):
+    """SplitMix64 finalizer over a uint64 array (wraps mod 2**64)"""
+    x = (x ^ (x >> np.uint64(30))) * _MIX_MUL1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_MUL2
+    return x ^ (x >> np.uint64(31))
+
+@njit(cache=True, fastmath=True)
+def _fallback_aqi_kernel(seeds, doys, base_table, hour_effect):
+    """Seasonal base + N(0, 12) per seed via Box-Muller, clipped to 20-120 (unrounded)"""
+    # Two independent 53-bit uniforms per seed; u1 in (0, 1] keeps log() finite
+    u1 = 1.0 - (_splitmix64(seeds + _GOLDEN_GAMMA) >> np.uint64(11)).astype(np.float64) / 9007199254740992.0
+    u2 = (_splitmix64(seeds + _GOLDEN_GAMMA2) >> np.uint64(11)).astype(np.float64) / 9007199254740992.0
+    z = np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+    aqi = base_table[doys - 1] + 12.0 * z + hour_effect
+    return np.minimum(np.maximum(aqi, 20.0), 120.0)
+
+def _compute_batch_aqi(date_strs, offset_hours=0):
+    """FIXED: Consistent AQI for a sequence of 'YYYY-MM-DD' dates in one pass (15-150 range)"""
+    if models_trained:
+        target_dates = [_fast_parse_date(date_str) for date_str in date_strs]
+        if offset_hours > 0:
+            target_dates = [target_date + timedelta(hours=offset_hours) for target_date in target_dates]
+        return np.asarray(get_aqi_system().predict_aqi_batch(target_dates), dtype=int)
+
+    # FIXED fallback with proper ranges
+    doys = np.array([_fast_parse_date(date_str).timetuple().tm_yday for date_str in date_strs], dtype=np.int64)
+
+    # One hashed seed per date keeps each day's value stable whatever batch it is in
+    seeds = np.array([_seed_for(f"{date_str}-{offset_hours}") for date_str in date_strs], dtype=np.uint64)
+    hour_effect = offset_hours * 0.5 if offset_hours > 0 else 0.0
+
+    # Base AQI with seasonal pattern (25-100 range), FIXED: Proper bounds
+    aqi = _fallback_aqi_kernel(seeds, doys, _BASE_AQI, float(hour_effect))
+    return np.round(aqi).astype(int)
+
+@lru_cache(maxsize=1024)
+def _batch_aqi(date_strs, offset_hours=0):
+    """Memoized _compute_batch_aqi for a tuple of dates; the returned array is read-only"""
+    aqis = _compute_batch_aqi(date_strs, offset_hours)
+    aqis.flags.writeable = False
+    return aqis
+
+@lru_cache(maxsize=4096)
 def get_consistent_aqi_for_date(date_str, offset_hours=0):
     """FIXED: Generate consistent AQI for a specific date (15-150 range)"""
-    if models_trained and aqi_system:
-        target_date = datetime.strptime(date_str, '%Y-%m-%d')
-        if offset_hours > 0:
-            target_date += timedelta(hours=offset_hours)
-        aqi = aqi_system.predict_aqi_for_date(target_date)
-        return round(aqi)
-    else:
-        # FIXED fallback with proper ranges
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-        day_of_year = date_obj.timetuple().tm_yday
-        
-        # Seed for consistency
-        seed_string = f"{date_str}-{offset_hours}"
-        date_seed = int(hashlib.md5(seed_string.encode()).hexdigest()[:8], 16) % (2**32)
-        np.random.seed(date_seed)
-        
-        # Base AQI with seasonal pattern (25-100 range)
-        base_aqi = 50 + 20 * np.sin(day_of_year * 2 * np.pi / 365)
-        daily_variation = np.random.normal(0, 12)
-        hour_effect = offset_hours * 0.5 if offset_hours > 0 else 0
-        
-        aqi = base_aqi + daily_variation + hour_effect
-        aqi = max(20, min(120, aqi))  # FIXED: Proper bounds
-        
-        np.random.seed(None)
-        return round(aqi)
+    return int(_compute_batch_aqi((date_str,), offset_hours)[0])
 
 def generate_consistent_chart_data(base_date):
     """FIXED: Generate consistent 12-month chart data (proper AQI ranges)"""
-    chart_data = []
-    year = base_date.year
-    month = base_date.month
-    
-    for i in range(12):
-        chart_month = month - 11 + i
-        chart_year = year
-        
-        while chart_month <= 0:
-            chart_month += 12
-            chart_year -= 1
-        
-        month_date_str = f"{chart_year}-{chart_month:02d}-15"
-        monthly_aqi = get_consistent_aqi_for_date(month_date_str)
-        chart_data.append(monthly_aqi)
+    # 12 months ending at base_date's month; month indices <= 0 roll back into earlier years
+    month_idx = np.arange(base_date.month - 11, base_date.month + 1)
+    years = base_date.year + (month_idx - 1) // 12
+    months = (month_idx - 1) % 12 + 1
     
-    return chart_data
+    month_date_strs = tuple(f"{year}-{month:02d}-15" for year, month in zip(years.tolist(), months.tolist()))
+    return _batch_aqi(month_date_strs).tolist()
 
 @app.route('/api/dashboard', methods=['GET'])
+@cache.cached(timeout=3600, make_cache_key=_request_cache_key, response_filter=_is_cacheable)
 def get_dashboard_data():
     try:
         date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
-        target_date = datetime.strptime(date_str, '%Y-%m-%d')
+        target_date = _fast_parse_date(date_str)
         
-        print(f"📅 Dashboard API called for date: {date_str}")
+        log.debug("📅 Dashboard API called for date: %s", date_str)
         
         # FIXED: Get proper AQI values
         current_aqi = get_consistent_aqi_for_date(date_str)
@@ -125,36 +273,33 @@ def get_dashboard_data():
         next_day_aqi = get_consistent_aqi_for_date(next_day_str)
         
         # Get pollutant data
-        if models_trained and aqi_system:
+        if models_trained:
+            aqi_system = get_aqi_system()
             main_pollutant = aqi_system.get_main_pollutant_for_date(target_date)
             concentrations = aqi_system.predict_pollutant_concentrations(target_date)
         else:
             # FIXED fallback
-            date_seed = int(hashlib.md5(date_str.encode()).hexdigest()[:8], 16) % (2**32)
-            np.random.seed(date_seed)
+            rng = default_rng(_seed_for(date_str))
             
             main_pollutant = 'PM2.5 - Local Conditions'
             concentrations = {
-                'PM2.5 - Local Conditions': 15 + np.random.normal(0, 6),
-                'Ozone': 0.04 + np.random.normal(0, 0.015),
-                'Nitrogen dioxide (NO2)': 0.025 + np.random.normal(0, 0.010),
-                'Carbon monoxide': 1.2 + np.random.normal(0, 0.4)
+                'PM2.5 - Local Conditions': 15 + rng.normal(0, 6),
+                'Ozone': 0.04 + rng.normal(0, 0.015),
+                'Nitrogen dioxide (NO2)': 0.025 + rng.normal(0, 0.010),
+                'Carbon monoxide': 1.2 + rng.normal(0, 0.4)
             }
-            np.random.seed(None)
         
         # FIXED: Generate proper 12-month chart data
         chart_data = generate_consistent_chart_data(target_date)
         
-        sensor_data = {
-            'pm25': round(concentrations.get('PM2.5 - Local Conditions', 20), 1),
-            'o3': round(concentrations.get('Ozone', 0.05) * 1000, 1),
-            'no2': round(concentrations.get('Nitrogen dioxide (NO2)', 0.03) * 1000, 1)
-        }
+        readings = {key: round(concentrations.get(pollutant, default) * scale, 1)
+                    for key, pollutant, default, scale, _ in _SENSOR_SPEC}
+        sensor_data = {key: readings[key] for key in _SENSOR_DATA_KEYS}
         
         aqi_category = get_aqi_category(current_aqi)
         next_day_category = get_aqi_category(next_day_aqi)
         
-        print(f"🎯 Dashboard returning: AQI {current_aqi} ({aqi_category}) for {date_str}")
+        log.debug("🎯 Dashboard returning: AQI %s (%s) for %s", current_aqi, aqi_category, date_str)
         
         return jsonify({
             'current_aqi': current_aqi,
@@ -163,54 +308,49 @@ def get_dashboard_data():
             'next_day_aqi': next_day_aqi,
             'next_day_category': next_day_category,
             'sensor_data': sensor_data,
-            'pollutant_concentrations': {
-                'pm25': f"{sensor_data['pm25']} µg/m³",
-                'co': f"{round(concentrations.get('Carbon monoxide', 1.5), 1)} ppm",
-                'o3': f"{sensor_data['o3']} ppb"
-            },
+            'pollutant_concentrations': {key: f"{readings[key]} {_SENSOR_UNITS[key]}" for key in _CONCENTRATION_KEYS},
             'chart_aqi': chart_data,
             'date': date_str
         })
     
     except Exception as e:
-        print(f"❌ Dashboard error: {e}")
+        log.error("❌ Dashboard error: %s", e)
         return jsonify({
             'error': f'Failed to get dashboard data: {str(e)}'
         }), 500
 
 @app.route('/api/prediction', methods=['GET'])
+@cache.cached(timeout=3600, make_cache_key=_request_cache_key, response_filter=_is_cacheable)
 def get_prediction_data():
     try:
         model_name = request.args.get('model', 'gradient_boosting')
         date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
-        target_date = datetime.strptime(date_str, '%Y-%m-%d')
+        target_date = _fast_parse_date(date_str)
         
-        print(f"Prediction API called for date: {date_str}, model: {model_name}")
+        log.debug("Prediction API called for date: %s, model: %s", date_str, model_name)
         
         # FIXED: Get proper AQI prediction
         overall_aqi = get_consistent_aqi_for_date(date_str)
         aqi_category = get_aqi_category(overall_aqi)
         
         # Get pollutant forecast
-        if models_trained and aqi_system:
-            concentrations = aqi_system.predict_pollutant_concentrations(target_date, model_name)
+        if models_trained:
+            concentrations = get_aqi_system().predict_pollutant_concentrations(target_date, model_name)
         else:
             # FIXED fallback
-            date_seed = int(hashlib.md5(date_str.encode()).hexdigest()[:8], 16) % (2**32)
-            np.random.seed(date_seed)
+            rng = default_rng(_seed_for(date_str))
             
             concentrations = {
-                'PM2.5 - Local Conditions': 15 + np.random.normal(0, 8),
-                'PM10 Total 0-10um STP': 25 + np.random.normal(0, 12),
-                'Nitrogen dioxide (NO2)': 0.025 + np.random.normal(0, 0.012),
-                'Sulfur dioxide': 0.015 + np.random.normal(0, 0.006),
-                'Carbon monoxide': 1.2 + np.random.normal(0, 0.5),
-                'Ozone': 0.045 + np.random.normal(0, 0.018)
+                'PM2.5 - Local Conditions': 15 + rng.normal(0, 8),
+                'PM10 Total 0-10um STP': 25 + rng.normal(0, 12),
+                'Nitrogen dioxide (NO2)': 0.025 + rng.normal(0, 0.012),
+                'Sulfur dioxide': 0.015 + rng.normal(0, 0.006),
+                'Carbon monoxide': 1.2 + rng.normal(0, 0.5),
+                'Ozone': 0.045 + rng.normal(0, 0.018)
             }
-            np.random.seed(None)
         
         pollutant_forecast = {
-            'labels': ['PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'O3'],
+            'labels': _FORECAST_LABELS,
             'data': [
                 round(concentrations.get('PM2.5 - Local Conditions', 20)),
                 round(concentrations.get('PM10 Total 0-10um STP', 30)),
@@ -222,16 +362,10 @@ def get_prediction_data():
         }
         
         # FIXED: Generate 7-day trend with proper values
-        trend_labels = []
-        trend_data = []
-        
-        for i in range(7):
-            trend_date = target_date + timedelta(days=i)
-            trend_date_str = trend_date.strftime('%Y-%m-%d')
-            trend_aqi = get_consistent_aqi_for_date(trend_date_str)
-            
-            trend_labels.append(trend_date.strftime('%m-%d'))
-            trend_data.append(trend_aqi)
+        trend_days = np.datetime64(target_date, 'D') + np.arange(7, dtype='timedelta64[D]')
+        trend_date_strs = tuple(np.datetime_as_string(trend_days).tolist())
+        trend_labels = [trend_date_str[5:] for trend_date_str in trend_date_strs]
+        trend_data = _batch_aqi(trend_date_strs).tolist()
         
         trend_data_obj = {
             'labels': trend_labels,
@@ -239,30 +373,21 @@ def get_prediction_data():
         }
         
         # FIXED: High performance model metrics
-        if models_trained and aqi_system and hasattr(aqi_system, 'model_performances'):
+        if models_trained and hasattr(get_aqi_system(), 'model_performances'):
+            performances = get_aqi_system().model_performances
             accuracy_data = {
-                'labels': ['GB', 'XGB', 'RF', 'LSTM'],
+                'labels': _ACCURACY_LABELS,
                 'data': [
-                    round(aqi_system.model_performances.get('gradient_boosting', {}).get('r2_score', 0.849) * 100, 1),
-                    round(aqi_system.model_performances.get('xgboost', {}).get('r2_score', 0.830) * 100, 1),
-                    round(aqi_system.model_performances.get('random_forest', {}).get('r2_score', 0.801) * 100, 1),
-                    round(aqi_system.model_performances.get('lstm', {}).get('r2_score', 0.603) * 100, 1)
+                    round(performances.get(model_key, {}).get('r2_score', default_r2) * 100, 1)
+                    for model_key, default_r2 in _ACCURACY_MODELS
                 ]
             }
-            model_performances = aqi_system.model_performances
+            model_performances = performances
         else:
-            accuracy_data = {
-                'labels': ['GB', 'XGB', 'RF', 'LSTM'],
-                'data': [84.9, 83.0, 80.1, 60.3]  # FIXED: High performance values
-            }
-            model_performances = {
-                'gradient_boosting': {'r2_score': 0.849, 'mae': 8.2, 'rmse': 11.3, 'mape': 12.9},
-                'xgboost': {'r2_score': 0.830, 'mae': 9.1, 'rmse': 13.8, 'mape': 14.5},
-                'random_forest': {'r2_score': 0.801, 'mae': 10.8, 'rmse': 15.2, 'mape': 16.2},
-                'lstm': {'r2_score': 0.603, 'mae': 14.5, 'rmse': 18.2, 'mape': 22.8}
-            }
+            accuracy_data = _DEFAULT_ACCURACY
+            model_performances = _DEFAULT_PERF
         
-        print(f"🎯 Prediction returning: AQI {overall_aqi} ({aqi_category}) for {date_str}")
+        log.debug("🎯 Prediction returning: AQI %s (%s) for %s", overall_aqi, aqi_category, date_str)
         
         return jsonify({
             'overall_aqi': overall_aqi,
@@ -276,13 +401,14 @@ def get_prediction_data():
         })
     
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
+        log.error("❌ Prediction error: %s", e)
         return jsonify({
             'error': f'Failed to get prediction data: {str(e)}'
         }), 500
 
 # FIXED: Single unified pollutants endpoint (removed duplicates)
 @app.route('/api/pollutants', methods=['GET'])
+@cache.cached(timeout=3600, make_cache_key=_request_cache_key, response_filter=_is_cacheable)
 def get_pollutants_data():
     try:
         year = int(request.args.get('year', datetime.now().year))
@@ -290,33 +416,25 @@ def get_pollutants_data():
         filter_type = request.args.get('filter', 'daily').lower()
         pollutant = request.args.get('pollutant', 'PM2.5')
 
-        print(f"🌪️ Pollutants API called: {year}-{month:02d}, filter={filter_type}, pollutant={pollutant}")
+        log.debug("🌪️ Pollutants API called: %d-%02d, filter=%s, pollutant=%s", year, month, filter_type, pollutant)
 
         # FIXED: Generate chart data with proper structure
         chart_data = generate_working_chart_data(filter_type, pollutant, year, month)
         
         if not chart_data or not chart_data.get('labels') or not chart_data.get('data'):
-            print("Chart data generation failed, using emergency fallback")
+            log.warning("Chart data generation failed, using emergency fallback")
             chart_data = get_emergency_chart_data(filter_type)
 
         # Generate highest concentration days
-        if models_trained and aqi_system:
-            highest_days = aqi_system.get_highest_concentration_days(year, month)
+        if models_trained:
+            highest_days = get_aqi_system().get_highest_concentration_days(year, month)
         else:
             highest_days = get_fallback_highest_days(month, year)
 
         highest_concentration = []
-        pollutant_mapping = {
-            'PM2.5 - Local Conditions': 'PM2.5',
-            'Ozone': 'O3',
-            'Nitrogen dioxide (NO2)': 'NO2',
-            'Sulfur dioxide': 'SO2',
-            'Carbon monoxide': 'CO',
-            'PM10 Total 0-10um STP': 'PM10'
-        }
 
         for pollutant_name, data in highest_days.items():
-            display_name = pollutant_mapping.get(pollutant_name, pollutant_name)
+            display_name = _POLLUTANT_DISPLAY.get(pollutant_name, pollutant_name)
             highest_concentration.append({
                 'day': data['day'],
                 'month_name': datetime(year, month, 1).strftime('%B'),
@@ -327,30 +445,28 @@ def get_pollutants_data():
 
         # FIXED: Generate monthly calendar with PROPER AQI values (15-150)
         calendar_data = []
-        from calendar import monthrange
         _, num_days = monthrange(year, month)
         
-        for day in range(1, num_days + 1):
-            date_str = f"{year}-{month:02d}-{day:02d}"
-            daily_aqi = get_consistent_aqi_for_date(date_str)  # FIXED: Proper AQI
-            
+        calendar_date_strs = tuple(f"{year}-{month:02d}-{day:02d}" for day in range(1, num_days + 1))
+        calendar_aqis = _batch_aqi(calendar_date_strs)  # FIXED: Proper AQI
+        calendar_categories = get_aqi_categories(calendar_aqis)
+        
+        for day, date_str, daily_aqi, category in zip(range(1, num_days + 1), calendar_date_strs,
+                                                      calendar_aqis.tolist(), calendar_categories):
             # Get main pollutant for this date
-            if models_trained and aqi_system:
+            if models_trained:
                 date_obj = datetime(year, month, day)
-                main_pollutant = aqi_system.get_main_pollutant_for_date(date_obj)
+                main_pollutant = get_aqi_system().get_main_pollutant_for_date(date_obj)
             else:
                 # FIXED fallback
-                day_seed = int(hashlib.md5(date_str.encode()).hexdigest()[:8], 16) % (2**32)
-                np.random.seed(day_seed)
                 pollutants = ['PM2.5', 'O3', 'NO2', 'PM10']
-                main_pollutant = np.random.choice(pollutants)
-                np.random.seed(None)
+                main_pollutant = pollutants[default_rng(_seed_for(date_str)).integers(len(pollutants))]
             
             calendar_data.append({
                 'day': day,
                 'aqi': daily_aqi,  # FIXED: Now 15-150 range
-                'category': get_aqi_category(daily_aqi),
-                'main_pollutant': pollutant_mapping.get(main_pollutant, main_pollutant)
+                'category': category,
+                'main_pollutant': _POLLUTANT_DISPLAY.get(main_pollutant, main_pollutant)
             })
 
         response_data = {
@@ -362,17 +478,15 @@ def get_pollutants_data():
             'selected_pollutant': pollutant
         }
 
-        print(f"✅ Pollutants returning data for {year}-{month:02d}")
-        print(f"📊 Chart data: {len(chart_data.get('labels', []))} points")
-        print(f"📅 Calendar data: {len(calendar_data)} days")
-        print(f"🏆 Highest concentration: {len(highest_concentration)} pollutants")
+        log.debug("✅ Pollutants returning data for %d-%02d", year, month)
+        log.debug("📊 Chart data: %d points", len(chart_data.get('labels', [])))
+        log.debug("📅 Calendar data: %d days", len(calendar_data))
+        log.debug("🏆 Highest concentration: %d pollutants", len(highest_concentration))
         
         return jsonify(response_data)
 
     except Exception as e:
-        print(f"❌ Pollutants API error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ Pollutants API error: %s", e)
         return jsonify({
             'error': f'Failed to get pollutants data: {str(e)}'
         }), 500
@@ -380,7 +494,7 @@ def get_pollutants_data():
 def generate_working_chart_data(filter_type, pollutant, year, month):
     """FIXED: Generate working chart data with proper AQI ranges (15-120)"""
     try:
-        print(f"Generating {filter_type} data for {pollutant} in {year}-{month}")
+        log.debug("Generating %s data for %s in %s-%s", filter_type, pollutant, year, month)
 
         labels = []
         data = []
@@ -393,27 +507,13 @@ def generate_working_chart_data(filter_type, pollutant, year, month):
             else:
                 base_date_str = f"{year}-{month:02d}-15"
             
-            base_hours = [0, 3, 6, 9, 12, 15, 18, 21]
             base_aqi = get_consistent_aqi_for_date(base_date_str)
 
-            for hour in base_hours:
-                time_label = f"{hour:02d}:00"
-                labels.append(time_label)
-                
-                # FIXED: Realistic hourly variation (±20%)
-                hour_multiplier = 1.0
-                if hour in [0, 3, 21]:  # Night - lower
-                    hour_multiplier = 0.85
-                elif hour in [6, 9]:   # Morning rush - higher
-                    hour_multiplier = 1.15
-                elif hour in [12, 15]: # Afternoon peak - highest
-                    hour_multiplier = 1.25
-                elif hour == 18:      # Evening rush
-                    hour_multiplier = 1.10
-                
-                hourly_aqi = base_aqi * hour_multiplier * np.random.uniform(0.9, 1.1)
-                hourly_aqi = max(20, min(110, hourly_aqi))  # FIXED: Proper bounds
-                data.append(round(hourly_aqi))
+            # All 8 readings in one pass, with noise seeded by the date so the chart is stable
+            noise = default_rng(_seed_for(base_date_str)).uniform(0.9, 1.1, size=len(_HOUR_MULT_TABLE))
+            hourly_aqi = np.clip(base_aqi * _HOUR_MULT_TABLE * noise, 20, 110)  # FIXED: Proper bounds
+            labels = list(_HOURLY_LABELS)
+            data = np.round(hourly_aqi).astype(int).tolist()
                 
         elif filter_type == 'weekly':
             week_labels = ['Week 1', 'Week 2', 'Week 3', 'Week 4']
@@ -426,7 +526,6 @@ def generate_working_chart_data(filter_type, pollutant, year, month):
                 data.append(weekly_aqi)
                 
         else:  # daily
-            from calendar import monthrange
             _, num_days = monthrange(year, month)
             
             today = datetime.now()
@@ -460,16 +559,16 @@ def generate_working_chart_data(filter_type, pollutant, year, month):
             'data': data
         }
         
-        print(f"✅ Chart data: {len(labels)} points, AQI range {min(data)}-{max(data)}")
+        log.debug("✅ Chart data: %d points, AQI range %s-%s", len(labels), min(data), max(data))
         return result
         
     except Exception as e:
-        print(f"Chart data generation error: {e}")
+        log.error("Chart data generation error: %s", e)
         return get_emergency_chart_data(filter_type)
 
 def get_emergency_chart_data(filter_type):
     """FIXED: Emergency fallback chart data with proper AQI ranges"""
-    print(f"Using emergency chart data for {filter_type}")
+    log.warning("Using emergency chart data for %s", filter_type)
     
     if filter_type == 'hourly':
         result = {
@@ -487,13 +586,13 @@ def get_emergency_chart_data(filter_type):
             'data': [42, 48, 35, 58, 46, 53, 40]  # FIXED: 35-60 range
         }
     
-    print(f"Emergency chart data: {result}")
+    log.debug("Emergency chart data: %s", result)
     return result
 
 def get_fallback_highest_days(month, year):
     """FIXED: Consistent fallback highest concentration days"""
     month_str = f"{year}-{month:02d}"
-    month_seed = int(hashlib.md5(month_str.encode()).hexdigest()[:8], 16) % (2**32)
+    month_seed = _seed_for(month_str)
     
     pollutants_data = {}
     pollutants_info = [
@@ -505,17 +604,16 @@ def get_fallback_highest_days(month, year):
     ]
     
     for i, (pollutant, unit, base, std) in enumerate(pollutants_info):
-        pollutant_seed = month_seed + i * 1000
-        np.random.seed(pollutant_seed)
-        random.seed(pollutant_seed)
+        pollutant_seed = (month_seed + i * 1000) % (2**32)
+        rng = default_rng(pollutant_seed)
         
-        day = random.randint(1, 28)
+        day = int(rng.integers(1, 29))
         
         # FIXED: Proper concentration ranges
         if unit == 'ppm':
-            concentration = max(0.3, min(2.5, base + np.random.normal(0, std)))
+            concentration = max(0.3, min(2.5, base + rng.normal(0, std)))
         else:
-            concentration = max(base * 0.5, min(base * 1.8, base + np.random.normal(0, std)))
+            concentration = max(base * 0.5, min(base * 1.8, base + rng.normal(0, std)))
         
         pollutants_data[pollutant] = {
             'day': day,
@@ -523,12 +621,10 @@ def get_fallback_highest_days(month, year):
             'unit': unit
         }
     
-    np.random.seed(None) 
-    random.seed(None)
-    
     return pollutants_data
 
 @app.route('/api/recommendations', methods=['GET'])
+@cache.cached(timeout=3600, make_cache_key=_request_cache_key, response_filter=_is_cacheable)
 def get_recommendations():
     """Get health recommendations based on AQI"""
     try:
@@ -588,28 +684,28 @@ def get_recommendations():
             'error': f'Failed to get recommendations: {str(e)}'
         }), 500
 
+# Upper bound (inclusive) of each AQI category; anything above the last edge is Hazardous
+_AQI_EDGES = (50, 100, 150, 200, 300)
+_AQI_EDGES_ARRAY = np.array(_AQI_EDGES)
+_AQI_CATEGORIES = ('Good', 'Moderate', 'Unhealthy for Sensitive Groups',
+                   'Unhealthy', 'Very Unhealthy', 'Hazardous')
+
 def get_aqi_category(aqi):
     """Convert AQI value to category"""
-    if aqi <= 50:
-        return 'Good'
-    elif aqi <= 100:
-        return 'Moderate'
-    elif aqi <= 150:
-        return 'Unhealthy for Sensitive Groups'
-    elif aqi <= 200:
-        return 'Unhealthy'
-    elif aqi <= 300:
-        return 'Very Unhealthy'
-    else:
-        return 'Hazardous'
+    return _AQI_CATEGORIES[bisect_left(_AQI_EDGES, aqi)]
+
+def get_aqi_categories(aqis):
+    """Vectorized get_aqi_category for an array of AQI values"""
+    return [_AQI_CATEGORIES[i] for i in np.searchsorted(_AQI_EDGES_ARRAY, aqis, side='left').tolist()]
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     print("Starting AirSight API Server - COMPLETELY FIXED!")
     print("Model Status:", "FIXED_HIGH_PERFORMANCE")
     
-    if models_trained and aqi_system:
+    if models_trained:
         print("FIXED Model Performance Summary:")
-        for model_name, metrics in aqi_system.model_performances.items():
+        for model_name, metrics in get_aqi_system().model_performances.items():
             print(f"  {model_name}: R² = {metrics['r2_score']:.3f}")
     
     print("\nAvailable endpoints:")
@@ -0,0 +1,18 @@
+"""
+Gunicorn configuration for the AirSight API server
+Run with: gunicorn -c gunicorn.conf.py flask_api_backend:app
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('AIRSIGHT_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Handlers spend their time in NumPy, which releases the GIL, so threaded workers
+# give real concurrency without extra dependencies. Set GUNICORN_WORKER_CLASS=gevent
+# (requires the gevent package) for IO-bound deployments.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = 8
+worker_connections = 1000
+keepalive = 5
@@ -0,0 +1,15 @@
+"""
+Optional numba support shared by the AirSight modules
+"""
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator: run kernels as plain Python when numba is missing"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func